@@ -2,16 +2,28 @@
 # ETH Research Socials Bot - Scraper Script 
 # See LICENSE file for full license details.
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List, NoReturn
+import html
 import logging
+import random
+import re
+import threading
 import time
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 
+import orjson
 import requests
-from bs4 import BeautifulSoup, Tag
-from requests.exceptions import RequestException
+from selectolax.lexbor import LexborHTMLParser
+from requests.adapters import HTTPAdapter
+from requests.exceptions import (
+    ConnectionError as RequestsConnectionError,
+    HTTPError,
+    RequestException,
+    Timeout
+)
 
 # Custom exceptions for better error handling
 class ScraperException(Exception):
@@ -23,7 +35,7 @@ class NetworkError(ScraperException):
 class ParseError(ScraperException):
     """Raised when HTML parsing operations fail."""
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PostDetails:
     """Immutable data class for post details."""
     title: str
@@ -32,30 +44,105 @@ class PostDetails:
     authors: List[str]
     timestamp: datetime
 
-@classmethod
-def from_dict(cls, data:dict) -> PostDetails:
-    """Creat PostDetails from dictionary data."""
-    return cls(
-        title=data['title'],
-        link=data['link'],
-        topic_id=date['topic_id'],
-        authors=data['authors'],
-        timestamp=datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-    )
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PostDetails':
+        """Create PostDetails from dictionary data."""
+        return cls(
+            title=data['title'],
+            link=data['link'],
+            topic_id=data['topic_id'],
+            authors=data['authors'],
+            timestamp=datetime.fromisoformat(data['timestamp'])
+        )
+
+class _CircuitBreaker:
+    """Closed/Open/Half-Open circuit breaker guarding requests to one host."""
+
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    __slots__ = ('failure_threshold', 'recovery_timeout', 'state', 'failures',
+                 'opened_at', '_lock')
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: int = 60) -> None:
+        """
+        Initialize a closed circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures before the circuit opens
+            recovery_timeout: Seconds to fail fast before allowing a probe request
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent, moving OPEN to HALF_OPEN after cooldown.
+
+        Returns:
+            True if the request may proceed, False if it should fail fast
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if (self.state == self.OPEN
+                    and time.monotonic() - self.opened_at >= self.recovery_timeout):
+                # Let a single probe through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the circuit and reset the failure count."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        """Count a failure and open the circuit if the threshold is crossed."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
 
 class EthResearchScraper:
     """Scraper for ethresear.ch website."""
+
+    __slots__ = ('session', 'max_retries', 'retry_delay', 'timeout', 'logger',
+                 '_detail_cache', '_breakers', '_breakers_lock')
     
     # Class-level constants
     BASE_URL = "https://ethresear.ch"
     LATEST_PATH = "/latest"
+    TOPIC_JSON_PATH = "/t/{topic_id}.json"
     MAX_TOPICS_TO_CHECK = 20
+    POOL_SIZE = 32
+    MAX_FETCH_WORKERS = 8
+    MAX_BACKOFF = 60
+    DETAIL_CACHE_TTL = 3600
+    RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
     SKIP_PHRASES = frozenset({
         'read this before posting',
         'read before posting',
         'posting guidelines',
         'posting rules'
     })
+    _SKIP_RE = re.compile('|'.join(re.escape(p) for p in SKIP_PHRASES), re.I)
+
+    # Patterns used to pull Post #1 out of a topic page without building a DOM
+    _POST1_RE = re.compile(rb'<div\b[^>]*\bid=["\']post_1["\'][^>]*>')
+    _NEXT_POST_RE = re.compile(rb'<div\b[^>]*\bid=["\']post_\d+["\']')
+    _AUTHOR_RE = re.compile(
+        rb'itemprop=["\']author["\'].*?itemprop=["\']name["\'][^>]*>([^<]+)<',
+        re.S
+    )
+    _DATETIME_RE = re.compile(rb'<time\b[^>]*\bdatetime=["\']([^"\']+)["\']')
 
     def __init__(
         self,
@@ -75,17 +162,69 @@ class EthResearchScraper:
         self.session.headers.update({
             'User-Agent': 'ETHResearchSocialsBot/1.0 (Compatible; Research Project)',
             'Accept': 'text/html,application/xhtml+xml',
-            'Accept-Language': 'en-US,en;q=0.9'
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive'
         })
+
+        # Reuse pooled connections across topic fetches; retries are handled
+        # by _fetch_with_retry, so the adapter itself never retries
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_SIZE,
+            pool_maxsize=self.POOL_SIZE,
+            max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.timeout = timeout
 
+        # Parsed topic details keyed by topic ID, with the time they were cached
+        self._detail_cache: dict[str, tuple[float, dict]] = {}
+
+        # One circuit breaker per host, created on first request
+        self._breakers: dict[str, _CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
         # Configure logging
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
 
-    def _fetch_with_retry(self, url: str) -> str:
+    def _is_transient(self, error: RequestException) -> bool:
+        """
+        Check whether a failed request is worth retrying.
+
+        Args:
+            error: The exception raised by the request
+
+        Returns:
+            True for timeouts, connection errors and retryable HTTP statuses
+        """
+        if isinstance(error, (Timeout, RequestsConnectionError)):
+            return True
+        if isinstance(error, HTTPError) and error.response is not None:
+            return error.response.status_code in self.RETRYABLE_STATUS_CODES
+        return False
+
+    def _get_breaker(self, url: str) -> _CircuitBreaker:
+        """
+        Get the circuit breaker for the host of a URL.
+
+        Args:
+            url: The URL about to be fetched
+
+        Returns:
+            The host's circuit breaker
+        """
+        host = urlparse(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = _CircuitBreaker()
+            return breaker
+
+    def _fetch_with_retry(self, url: str) -> bytes:
         """
         Fetch a URL with retry logic for handling temporary failures
 
@@ -93,26 +232,42 @@ class EthResearchScraper:
             url: The URL to fetch
 
         Returns:
-            The response text content
+            The raw response body, left undecoded
 
         Raises:
-            NetworkError: If all try attempts fail
+            NetworkError: If all try attempts fail, the error is not transient,
+                or the host's circuit breaker is open
         """
+        breaker = self._get_breaker(url)
         for attempt in range(self.max_retries):
+            if not breaker.allow_request():
+                raise NetworkError(f"Circuit open for {url}, failing fast")
+
             try:
                 response = self.session.get(
                     url,
                     timeout=self.timeout
                 )
                 response.raise_for_status()
-                return response.text
+                breaker.record_success()
+                return response.content
             except RequestException as e:
+                if not self._is_transient(e):
+                    # Not an outage, so it does not count against the host
+                    breaker.record_success()
+                    raise NetworkError(f"Request failed for {url}: {str(e)}") from e
+
+                breaker.record_failure()
+
                 self.logger.warning(
                     f"Request failed (attempt {attempt + 1}/{self.max_retries}) for {url}: {str(e)}"
                 )
                 if attempt < self.max_retries - 1:
-                    retry_delay = self.retry_delay * (2 ** attempt)    #testing exponential backoff
-                    self.logger.info(f"Waiting {retry_delay}s before retrying...")
+                    # Exponential backoff with full jitter
+                    retry_delay = random.uniform(
+                        0, min(self.MAX_BACKOFF, self.retry_delay * (2 ** attempt))
+                    )
+                    self.logger.info(f"Waiting {retry_delay:.1f}s before retrying...")
                     time.sleep(retry_delay)
                 else:
                     raise NetworkError(f"All attempts failed for {url}") from e
@@ -131,52 +286,136 @@ class EthResearchScraper:
             ValueError: If topic ID cannot be extracted
         """
         try:
-            url = url.rstrip('/')  ###
-            return url.split('/')[-1]
-        except (IndexError, AttributeError) as e:
+            topic_id = url.rstrip('/').rpartition('/')[2]
+        except AttributeError as e:
             raise ValueError(f"Could not extract topic ID from {url}") from e
 
-    def _parse_post_details(self, soup: BeautifulSoup, url:str) -> Optional[dict]:
+        if not topic_id:
+            raise ValueError(f"Could not extract topic ID from {url}")
+        return topic_id
+
+    def _parse_post_details(self, tree: LexborHTMLParser, url:str) -> Optional[dict]:
         """
-        Parse post details from BeautifulSoup object.
+        Parse post details from a parsed HTML tree.
 
         Args:
-            soup: BeatifulSoup object of the post page
+            tree: LexborHTMLParser tree of the post page
             url: URL of the post
 
         Returns:
             Dictionary containing post details or None if Parsing fails
         """
-        first_post = soup.find('div', {
-            'id':'post_1',
-            'class':'topic-body crawler-post'
-        })
-        if not isinstance(first_post, Tag):
-            self.logger.warning("Could not find post #1 for {url}")
+        first_post = tree.css_first('div#post_1.topic-body.crawler-post')
+        if first_post is None:
+            self.logger.warning(f"Could not find post #1 for {url}")
             return None
 
-        author_element = first_post.select_one(
-            'span[itemprop="author"] span[itemprop = "name]'
+        author_element = first_post.css_first(
+            'span[itemprop="author"] span[itemprop="name"]'
         )
-        time_element = first_post.select_one('time[datetime]')
+        time_element = first_post.css_first('time[datetime]')
 
-        if not all(isinstance(elem, Tag) for elem in [author_element, time_element]):
+        if author_element is None or time_element is None:
             self.logger.warning(f"Missing required elements for {url}")
+            return None
 
-        timestamp = time_element.get('datetime')
+        timestamp = time_element.attributes.get('datetime')
         if not timestamp:
             self.logger.warning(f"No datetime found for {url}")
             return None
         
         return {
-            'author': author_element.get_text(strip=True),
+            'author': author_element.text(strip=True),
             'timestamp': timestamp,
             'is_post_1': True
         }
 
+    def _scan_post_details(self, fragment: bytes) -> Optional[dict]:
+        """
+        Extract post details from a Post #1 HTML fragment using regexes only.
+
+        Args:
+            fragment: HTML fragment starting at the Post #1 div
+
+        Returns:
+            Dictionary containing post details or None if a field is not found
+        """
+        author_match = self._AUTHOR_RE.search(fragment)
+        time_match = self._DATETIME_RE.search(fragment)
+        if author_match is None or time_match is None:
+            return None
+
+        return {
+            'author': html.unescape(
+                author_match.group(1).strip().decode('utf-8', errors='replace')
+            ),
+            'timestamp': time_match.group(1).decode('ascii', errors='replace'),
+            'is_post_1': True
+        }
+
+    def _parse_topic_page(self, html_content: bytes, url: str) -> Optional[dict]:
+        """
+        Parse Post #1 details out of a topic page.
+
+        Args:
+            html_content: HTML of the topic page
+            url: URL of the topic
+
+        Returns:
+            Dictionary containing post details or None if parsing fails
+        """
+        post_match = self._POST1_RE.search(html_content)
+        if post_match is None:
+            self.logger.warning(f"Could not find post #1 for {url}")
+            return None
+
+        # Only the Post #1 section is needed; cut at the next post
+        next_match = self._NEXT_POST_RE.search(html_content, post_match.end())
+        end = next_match.start() if next_match else len(html_content)
+        fragment = html_content[post_match.start():end]
+
+        if b'crawler-post' in post_match.group(0):
+            details = self._scan_post_details(fragment)
+            if details is not None:
+                return details
+
+        tree = LexborHTMLParser(fragment)
+        return self._parse_post_details(tree, url)
+
+    def _fetch_topic_json(self, topic_id: str) -> dict:
+        """
+        Fetch Post #1 details from the Discourse JSON API.
+
+        Args:
+            topic_id: ID of the topic
+
+        Returns:
+            Dictionary containing post details
+
+        Raises:
+            NetworkError: if network operations fail
+            ParseError: if the JSON payload is malformed or lacks Post #1
+        """
+        json_url = urljoin(self.BASE_URL, self.TOPIC_JSON_PATH.format(topic_id=topic_id))
+        content = self._fetch_with_retry(json_url)
+        try:
+            first_post = orjson.loads(content)['post_stream']['posts'][0]
+            if first_post.get('post_number', 1) != 1:
+                raise ParseError(f"First post in {json_url} is not Post #1")
+            return {
+                'author': first_post['username'],
+                'timestamp': first_post['created_at'],
+                'is_post_1': True
+            }
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            raise ParseError(f"Unexpected JSON payload from {json_url}") from e
+
     def get_topic_details(self, url: str) -> Optional[dict]:
         """
         Fetch and parse topic details from a given URL
+
+        Details come from the Discourse JSON API, falling back to scraping the
+        topic page. Results are cached per topic ID for DETAIL_CACHE_TTL seconds.
         
         Args:
             url: Topic URL to fetch
@@ -188,13 +427,30 @@ class EthResearchScraper:
             NetworkError: if network operations fail
             ParseError: if HTML parsing fails
         """
+        topic_id = self._extract_topic_id(url)
+        cached = self._detail_cache.get(topic_id)
+        if cached is not None:
+            cached_at, details = cached
+            if time.monotonic() - cached_at < self.DETAIL_CACHE_TTL:
+                return details
+            self._detail_cache.pop(topic_id, None)
+
         try:
-            html_content = self._fetch_with_retry(url)
-            soup = BeautifulSoup(html_content, 'html.parser')
-            return self._parse_post_details(soup, url)
+            details = self._fetch_topic_json(topic_id)
         except (NetworkError, ParseError) as e:
-            self.logger.error(f"Error fetching topic details for {url}: {str(e)}")
-            return None
+            self.logger.warning(
+                f"JSON API failed for {url}, falling back to HTML: {str(e)}"
+            )
+            try:
+                html_content = self._fetch_with_retry(url)
+                details = self._parse_topic_page(html_content, url)
+            except (NetworkError, ParseError) as e:
+                self.logger.error(f"Error fetching topic details for {url}: {str(e)}")
+                return None
+
+        if details is not None:
+            self._detail_cache[topic_id] = (time.monotonic(), details)
+        return details
 
     def get_latest_post(self) -> Optional[PostDetails]:
         """
@@ -210,51 +466,64 @@ class EthResearchScraper:
         try:
             latest_url = urljoin(self.BASE_URL, self.LATEST_PATH)
             html_content = self._fetch_with_retry(latest_url)
-            soup = BeautifulSoup(html_content, 'html.parser')
+            tree = LexborHTMLParser(html_content)
 
-            topics = soup.select('tr.topic-list-item:not(.sticky)')
+            topics = tree.css('tr.topic-list-item:not(.sticky)')
             self.logger.info(f"Found {len(topics)} topic rows")
 
-            valid_posts = []
+            candidates = []
             for topic in topics[:self.MAX_TOPICS_TO_CHECK]:
-                if not isinstance(topic, Tag):
-                    continue
-
-                title_element = topic.select_one('td.main-link a.title')
-                if not isinstance(title_element, Tag):
+                title_element = topic.css_first('td.main-link a.title')
+                if title_element is None:
                     continue
 
-                title = title_element.get_text(strip=True)
-                if any(phrase in title.lower() for phrase in self.SKIP_PHRASES):
+                title = title_element.text(strip=True)
+                if self._SKIP_RE.search(title):
                     self.logger.info(f"Skipping filtered posts {title}")
                     continue
 
-                link = urljoin(self.BASE_URL, title_element.get('href', ''))
+                link = urljoin(self.BASE_URL, title_element.attributes.get('href') or '')
                 topic_id = self._extract_topic_id(link)
 
-                details = self.get_topic_details(link)
-                if not details or not details.get('is_post_1'):
-                    continue
-
-                valid_posts.append({
+                candidates.append({
                     'title': title,
                     'link': link,
-                    'topic_id': topic_id,
-                    'authors': [details['author']],
-                    'timestamp': details['timestamp']
+                    'topic_id': topic_id
                 })
 
-            if not valid_posts:
+            best_ts = None
+            best_candidate = None
+            best_details = None
+
+            # Topic pages are fetched concurrently; the GIL is released
+            # while requests waits on the network
+            with ThreadPoolExecutor(max_workers=self.MAX_FETCH_WORKERS) as executor:
+                details_iter = executor.map(
+                    self.get_topic_details,
+                    [candidate['link'] for candidate in candidates]
+                )
+                for candidate, details in zip(candidates, details_iter):
+                    if not details or not details.get('is_post_1'):
+                        continue
+
+                    ts = datetime.fromisoformat(details['timestamp'])
+                    if best_ts is None or ts > best_ts:
+                        best_ts = ts
+                        best_candidate = candidate
+                        best_details = details
+
+            if best_ts is None:
                 self.logger.warning("No valid Post #1s found")
                 return None
 
-            latest_post = max(
-                valid_posts, key=lambda x: datetime.fromisoformat(x['timestamp'].replace('Z', '+00:00')
-                )
+            return PostDetails(
+                title=best_candidate['title'],
+                link=best_candidate['link'],
+                topic_id=best_candidate['topic_id'],
+                authors=[best_details['author']],
+                timestamp=best_ts
             )
 
-            return PostDetails.from_dict(latest_post)
-
         except Exception as e:
             self.logger.error(f"Error in get_latest_post: {str(e)}")
             raise
\ No newline at end of file